@@ -12,6 +12,7 @@ CREATE TABLE IF NOT EXISTS orders (
   email TEXT NOT NULL,
   status TEXT NOT NULL,               -- placed | reserved | out_of_stock | paid | failed
   total_amount NUMERIC(12,2) NOT NULL,
+  priority TEXT NOT NULL DEFAULT 'standard', -- standard | express | vip
   created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
@@ -61,6 +62,17 @@ CREATE TABLE IF NOT EXISTS processed_events (
   PRIMARY KEY (service_name, event_id)
 );
 
+-- === Idempotency-Key replay store for POST /orders ===
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+  key TEXT PRIMARY KEY,
+  request_hash TEXT NOT NULL,         -- sha256 of the request body
+  order_id UUID REFERENCES orders(id) ON DELETE CASCADE,
+  response JSONB NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  expires_at TIMESTAMPTZ NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys(expires_at);
+
 -- === Seed inventory (T-shirt SKUs) ===
 INSERT INTO products (sku, name, price, stock_qty) VALUES
   ('TSHIRT-BLK-M','Black T-Shirt M',199.90,20),
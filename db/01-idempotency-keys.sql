@@ -0,0 +1,12 @@
+-- Idempotency-Key desteği (user-026) için migration.
+-- 00-init.sql yalnızca boş volume'da çalışır; mevcut veritabanına tekrar uygulanabilir:
+--   docker exec -i eda-postgres psql -U acme -d acme < db/01-idempotency-keys.sql
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+  key TEXT PRIMARY KEY,
+  request_hash TEXT NOT NULL,         -- sha256 of the request body
+  order_id UUID REFERENCES orders(id) ON DELETE CASCADE,
+  response JSONB NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  expires_at TIMESTAMPTZ NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys(expires_at);
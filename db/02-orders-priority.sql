@@ -0,0 +1,4 @@
+-- Sipariş öncelik lane'leri (user-030) için migration.
+-- 00-init.sql yalnızca boş volume'da çalışır; mevcut veritabanına tekrar uygulanabilir:
+--   docker exec -i eda-postgres psql -U acme -d acme < db/02-orders-priority.sql
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS priority TEXT NOT NULL DEFAULT 'standard'; -- standard | express | vip
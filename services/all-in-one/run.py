@@ -0,0 +1,98 @@
+"""
+Order API, outbox publisher and all workers in a single process on the
+in-process transport (EVENT_TRANSPORT=inproc). Only Postgres is needed.
+
+    python services/all-in-one/run.py serve          # API on :8000 + publisher + workers
+    python services/all-in-one/run.py smoke -n 50    # full order flow end-to-end, exits non-zero on failure
+"""
+import os, sys, time, argparse, threading, importlib.util
+from pathlib import Path
+
+SERVICES = Path(__file__).resolve().parent.parent
+WORKERS = ("inventory-service", "payment-service", "notification-service")
+TERMINAL = ("paid", "payment_failed", "out_of_stock")
+PRIORITIES = ("standard", "express", "vip")
+
+def load_module(name: str, path: Path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+def load_services():
+    os.environ["EVENT_TRANSPORT"] = "inproc"
+    sys.path.insert(0, str(SERVICES / "shared"))
+    sys.path.insert(0, str(SERVICES / "order-api"))
+    import transport
+
+    bus = transport.create_transport("all-in-one")
+    publisher = load_module("publisher", SERVICES / "order-publisher" / "publisher.py")
+    for name in WORKERS:
+        load_module(name.replace("-", "_"), SERVICES / name / "worker.py").register(bus)
+    return bus, publisher
+
+def serve(args):
+    bus, publisher = load_services()
+    import uvicorn
+    from app.main import app
+
+    bus.start()
+    threading.Thread(target=publisher.loop, args=(bus,), name="publisher", daemon=True).start()
+    print(f"[all-in-one] serving on {args.host}:{args.port}", flush=True)
+    uvicorn.run(app, host=args.host, port=args.port)
+
+def smoke(args):
+    bus, publisher = load_services()
+    from sqlalchemy import text
+    from app import crud, schemas, database
+
+    order_ids = []
+    with database.SessionLocal() as db:
+        for i in range(args.orders):
+            # tüm öncelik lane'lerinden geçsin
+            order = schemas.OrderCreate(customer_id=f"SMOKE-{i}", email="smoke@example.com",
+                                        items=[{"sku": args.sku, "qty": 1}],
+                                        priority=PRIORITIES[i % len(PRIORITIES)])
+            order_ids.append(str(crud.create_order_with_outbox(db, order).id))
+
+    t0 = time.perf_counter()
+    deadline = t0 + args.timeout
+    while True:
+        # publisher -> inventory -> payment -> notification, hepsi bu thread'de
+        while publisher.publish_pending(bus) or bus.drain():
+            pass
+        with database.SessionLocal() as db:
+            rows = db.execute(text("SELECT id::text, status FROM orders WHERE id = ANY(CAST(:ids AS uuid[]))"),
+                              {"ids": order_ids}).fetchall()
+        statuses = dict(rows)
+        pending = [oid for oid in order_ids if statuses.get(oid) not in TERMINAL]
+        if not pending or time.perf_counter() > deadline:
+            break
+        time.sleep(0.05)
+
+    elapsed = time.perf_counter() - t0
+    counts = {}
+    for status in statuses.values():
+        counts[status] = counts.get(status, 0) + 1
+    print(f"[all-in-one] {len(order_ids)} orders in {elapsed:.2f}s: {counts}", flush=True)
+    if pending:
+        print(f"[all-in-one] {len(pending)} orders did not reach a terminal status, e.g. {pending[0]}", flush=True)
+        sys.exit(1)
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = p.add_subparsers(dest="cmd", required=True)
+    s = sub.add_parser("serve")
+    s.add_argument("--host", default="127.0.0.1")
+    s.add_argument("--port", type=int, default=8000)
+    s.set_defaults(func=serve)
+    s = sub.add_parser("smoke")
+    s.add_argument("-n", "--orders", type=int, default=20)
+    s.add_argument("--sku", default="TSHIRT-BLK-M")
+    s.add_argument("--timeout", type=float, default=30.0)
+    s.set_defaults(func=smoke)
+    args = p.parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+import os, json, time, threading
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote
+import numpy as np
+from transport import create_transport
+
+SERVICE_NAME = "analytics-service"
+WINDOW_MIN = int(os.getenv("ANALYTICS_WINDOW_MIN", "60"))
+FLUSH_EVENTS = int(os.getenv("ANALYTICS_FLUSH_EVENTS", "500"))
+FLUSH_SEC = float(os.getenv("ANALYTICS_FLUSH_SEC", "0.2"))
+SNAPSHOT_PATH = os.getenv("ANALYTICS_SNAPSHOT_PATH", "/data/analytics.npz")
+SNAPSHOT_SEC = float(os.getenv("ANALYTICS_SNAPSHOT_SEC", "30"))
+HTTP_PORT = int(os.getenv("ANALYTICS_HTTP_PORT", "8001"))
+DEDUPE_SIZE = int(os.getenv("ANALYTICS_DEDUPE_SIZE", "100000"))
+
+# SKU x dakika metrikleri
+SKU_METRICS = ("units_placed", "units_paid", "revenue", "units_out_of_stock")
+# dakika metrikleri (sipariş seviyesi)
+MINUTE_METRICS = ("orders_placed", "orders_paid", "orders_out_of_stock", "revenue")
+S_PLACED, S_PAID, S_REVENUE, S_OOS = range(len(SKU_METRICS))
+# adetler float32'de (2^24'e kadar tam), tutar float64'te tutulur; metrik -> sku_units satırı
+UNIT_METRICS = [S_PLACED, S_PAID, S_OOS]
+UNIT_ROW = np.full(len(SKU_METRICS), -1, dtype=np.int64)
+UNIT_ROW[UNIT_METRICS] = np.arange(len(UNIT_METRICS))
+M_PLACED, M_PAID, M_OOS, M_REVENUE = range(len(MINUTE_METRICS))
+
+def now_minute() -> int:
+    return int(time.time() // 60)
+
+def _value(name: str, x) -> float:
+    # tutarlar kuruşa yuvarlanır (float64 toplam ~1e-9 sapabilir)
+    return round(float(x), 2) if name == "revenue" else float(x)
+
+class SalesWindow:
+    """
+    Son WINDOW_MIN dakikanın sayaçları, dizi tabanlı ring buffer'larda:
+    - sku_units[unit_metric, sku, slot]  slot = dakika % window
+    - sku_revenue[sku, slot]
+    - minute_stats[metric, slot]
+    slot_minute[slot] slot'un hangi dakikaya ait olduğunu tutar; eskiyen slot yeniden kullanılmadan sıfırlanır.
+    """
+
+    def __init__(self, window: int = WINDOW_MIN, sku_capacity: int = 1024):
+        self.window = window
+        self.sku_index = {}
+        self.skus = []
+        # 100k aktif SKU x 60 dk: 3 adet metriği float32 (72 MB) + tutar float64 (48 MB)
+        self.sku_units = np.zeros((len(UNIT_METRICS), sku_capacity, window), dtype=np.float32)
+        self.sku_revenue = np.zeros((sku_capacity, window), dtype=np.float64)
+        self.minute_stats = np.zeros((len(MINUTE_METRICS), window), dtype=np.float64)
+        self.slot_minute = np.full(window, -1, dtype=np.int64)
+        self.events = 0
+        self.lock = threading.Lock()
+
+    # --- yazma -------------------------------------------------------------
+
+    def _sku_ids(self, skus) -> np.ndarray:
+        ids = np.empty(len(skus), dtype=np.int64)
+        for i, sku in enumerate(skus):
+            idx = self.sku_index.get(sku)
+            if idx is None:
+                idx = self.sku_index[sku] = len(self.skus)
+                self.skus.append(sku)
+            ids[i] = idx
+        capacity = self.sku_revenue.shape[0]
+        if len(self.skus) > capacity:
+            grow = max(capacity, len(self.skus) - capacity)
+            pad = np.zeros((len(UNIT_METRICS), grow, self.window), dtype=self.sku_units.dtype)
+            self.sku_units = np.concatenate([self.sku_units, pad], axis=1)
+            self.sku_revenue = np.concatenate([self.sku_revenue, np.zeros((grow, self.window))], axis=0)
+        return ids
+
+    def _claim_slots(self, minutes: np.ndarray) -> np.ndarray:
+        """
+        Dakikaları slot'lara çevirir. Pencere içindeki dakikalar farklı slot'lara düşer;
+        başka (daha eski) bir dakikaya ait slot'lar sıfırlanıp yeni dakikaya devredilir.
+        """
+        slots = minutes % self.window
+        stale = np.unique(slots[self.slot_minute[slots] != minutes])
+        if stale.size:
+            self.sku_units[:, :, stale] = 0
+            self.sku_revenue[:, stale] = 0
+            self.minute_stats[:, stale] = 0
+            self.slot_minute[slots] = minutes
+        return slots
+
+    def apply(self, batch: "Batch"):
+        if not batch.n_events:
+            return
+        with self.lock:
+            # pencere dışına düşen (çok eski ya da ileri tarihli) kayıtlar atılır
+            now = now_minute()
+
+            minutes = np.asarray(batch.m_minute, dtype=np.int64)
+            keep = (minutes > now - self.window) & (minutes <= now)
+            if keep.any():
+                slots = self._claim_slots(minutes[keep])
+                np.add.at(self.minute_stats,
+                          (np.asarray(batch.m_metric, dtype=np.int64)[keep], slots),
+                          np.asarray(batch.m_value, dtype=np.float64)[keep])
+
+            minutes = np.asarray(batch.s_minute, dtype=np.int64)
+            keep = (minutes > now - self.window) & (minutes <= now)
+            if keep.any():
+                slots = self._claim_slots(minutes[keep])
+                sku_ids = self._sku_ids([sku for sku, k in zip(batch.s_sku, keep) if k])
+                metrics = np.asarray(batch.s_metric, dtype=np.int64)[keep]
+                values = np.asarray(batch.s_value, dtype=np.float64)[keep]
+                rev = metrics == S_REVENUE
+                np.add.at(self.sku_revenue, (sku_ids[rev], slots[rev]), values[rev])
+                np.add.at(self.sku_units, (UNIT_ROW[metrics[~rev]], sku_ids[~rev], slots[~rev]), values[~rev])
+
+            self.events += batch.n_events
+
+    # --- okuma -------------------------------------------------------------
+
+    def _live_slots(self, minutes: int) -> np.ndarray:
+        minutes = max(1, min(minutes, self.window))
+        return self.slot_minute > now_minute() - minutes
+
+    def _sku_sums(self, n: int, live: np.ndarray) -> np.ndarray:
+        """İlk n SKU için pencere toplamları: sums[metric, sku] (float64)."""
+        sums = np.empty((len(SKU_METRICS), n), dtype=np.float64)
+        sums[UNIT_METRICS] = self.sku_units[:, :n][:, :, live].sum(axis=2, dtype=np.float64)
+        sums[S_REVENUE] = self.sku_revenue[:n][:, live].sum(axis=1)
+        return sums
+
+    def totals(self, minutes: int) -> dict:
+        with self.lock:
+            live = self._live_slots(minutes)
+            sums = self.minute_stats[:, live].sum(axis=1)
+            order = np.argsort(self.slot_minute[live])
+            series = self.minute_stats[:, live][:, order]
+            series_minutes = self.slot_minute[live][order]
+        out = {name: _value(name, sums[i]) for i, name in enumerate(MINUTE_METRICS)}
+        placed = sums[M_PLACED]
+        out["out_of_stock_rate"] = float(sums[M_OOS] / placed) if placed else 0.0
+        out["per_minute"] = [
+            {"minute": int(m) * 60, **{name: _value(name, series[i, j]) for i, name in enumerate(MINUTE_METRICS)}}
+            for j, m in enumerate(series_minutes)
+        ]
+        return out
+
+    def _sku_rows(self, ids: np.ndarray, sums: np.ndarray):
+        rows = []
+        for idx in ids:
+            placed = sums[S_PLACED, idx]
+            rows.append({
+                "sku": self.skus[idx],
+                **{name: _value(name, sums[i, idx]) for i, name in enumerate(SKU_METRICS)},
+                "sell_through": float(sums[S_PAID, idx] / placed) if placed else 0.0,
+                "out_of_stock_rate": float(sums[S_OOS, idx] / placed) if placed else 0.0,
+            })
+        return rows
+
+    def top_skus(self, minutes: int, top: int, sort: str) -> list:
+        metric = SKU_METRICS.index(sort)
+        with self.lock:
+            live = self._live_slots(minutes)
+            n = len(self.skus)
+            sums = self._sku_sums(n, live)
+        if n == 0:
+            return []
+        top = max(1, min(top, n))
+        ids = np.argpartition(-sums[metric], top - 1)[:top]
+        ids = ids[np.argsort(-sums[metric, ids], kind="stable")]
+        return self._sku_rows(ids, sums)
+
+    def sku(self, sku: str, minutes: int):
+        with self.lock:
+            idx = self.sku_index.get(sku)
+            if idx is None:
+                return None
+            live = self._live_slots(minutes)
+            sums = self._sku_sums(idx + 1, live)
+        return self._sku_rows([idx], sums)[0]
+
+    # --- snapshot ----------------------------------------------------------
+
+    def save(self, path: str):
+        with self.lock:
+            n = len(self.skus)
+            arrays = {
+                "skus": np.array(self.skus, dtype=object).astype(str) if n else np.array([], dtype=str),
+                "sku_units": self.sku_units[:, :n].copy(),
+                "sku_revenue": self.sku_revenue[:n].copy(),
+                "minute_stats": self.minute_stats.copy(),
+                "slot_minute": self.slot_minute.copy(),
+                "events": np.array(self.events),
+            }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, window: int = WINDOW_MIN):
+        with np.load(path, allow_pickle=False) as data:
+            if data["slot_minute"].shape[0] != window:
+                raise ValueError(f"snapshot window {data['slot_minute'].shape[0]} != {window}")
+            skus = [str(s) for s in data["skus"]]
+            win = cls(window, sku_capacity=max(1024, len(skus)))
+            win.skus = skus
+            win.sku_index = {s: i for i, s in enumerate(skus)}
+            if "sku_units" in data:
+                win.sku_units[:, :len(skus)] = data["sku_units"]
+                win.sku_revenue[:len(skus)] = data["sku_revenue"]
+            else:
+                # eski snapshot: tüm SKU metrikleri tek float32 dizide
+                win.sku_units[:, :len(skus)] = data["sku_stats"][UNIT_METRICS]
+                win.sku_revenue[:len(skus)] = data["sku_stats"][S_REVENUE]
+            win.minute_stats[:] = data["minute_stats"]
+            win.slot_minute[:] = data["slot_minute"]
+            win.events = int(data["events"])
+        return win
+
+class Batch:
+    """Henüz uygulanmamış event'ler; flush'ta tek seferde numpy dizilerine çevrilir."""
+
+    def __init__(self):
+        self.n_events = 0
+        self.m_minute, self.m_metric, self.m_value = [], [], []
+        self.s_minute, self.s_sku, self.s_metric, self.s_value = [], [], [], []
+
+    def minute(self, minute: int, metric: int, value: float):
+        self.m_minute.append(minute)
+        self.m_metric.append(metric)
+        self.m_value.append(value)
+
+    def sku(self, minute: int, sku: str, metric: int, value: float):
+        self.s_minute.append(minute)
+        self.s_sku.append(sku)
+        self.s_metric.append(metric)
+        self.s_value.append(value)
+
+    def add(self, event_type: str, payload: dict, minute: int):
+        items = payload.get("items") or []
+        total = float(payload.get("total_amount") or 0)
+        if event_type == "order.placed":
+            self.minute(minute, M_PLACED, 1)
+            for it in items:
+                self.sku(minute, it["sku"], S_PLACED, it["qty"])
+        elif event_type == "payment.completed":
+            self.minute(minute, M_PAID, 1)
+            self.minute(minute, M_REVENUE, total)
+            for it in items:
+                self.sku(minute, it["sku"], S_PAID, it["qty"])
+                self.sku(minute, it["sku"], S_REVENUE, it["qty"] * float(it.get("unit_price") or 0))
+        elif event_type == "order.out_of_stock":
+            self.minute(minute, M_OOS, 1)
+            for it in items:
+                self.sku(minute, it["sku"], S_OOS, it["qty"])
+        else:
+            return
+        self.n_events += 1
+
+class Aggregator:
+    def __init__(self, window: SalesWindow):
+        self.window = window
+        self._batch = Batch()
+        self._lock = threading.Lock()
+        self._seen = OrderedDict()
+
+    def _duplicate(self, event_type: str, payload: dict) -> bool:
+        key = payload.get("event_id") or f"{event_type}:{payload.get('order_id')}"
+        if key in self._seen:
+            return True
+        self._seen[key] = None
+        if len(self._seen) > DEDUPE_SIZE:
+            self._seen.popitem(last=False)
+        return False
+
+    def on_event(self, event_type: str, payload: dict):
+        with self._lock:
+            if self._duplicate(event_type, payload):
+                return
+            self._batch.add(event_type, payload, now_minute())
+            full = self._batch.n_events >= FLUSH_EVENTS
+        if full:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            batch, self._batch = self._batch, Batch()
+        self.window.apply(batch)
+
+def load_window() -> SalesWindow:
+    if os.path.exists(SNAPSHOT_PATH):
+        try:
+            window = SalesWindow.load(SNAPSHOT_PATH)
+            print(f"[analytics] restored snapshot {SNAPSHOT_PATH} ({len(window.skus)} skus, {window.events} events)", flush=True)
+            return window
+        except Exception as e:
+            print(f"[analytics] snapshot restore failed: {e}; starting empty", flush=True)
+    return SalesWindow()
+
+def start_background(agg: Aggregator):
+    def _loop():
+        last_snapshot = time.monotonic()
+        while True:
+            time.sleep(FLUSH_SEC)
+            try:
+                agg.flush()
+                if time.monotonic() - last_snapshot >= SNAPSHOT_SEC:
+                    agg.window.save(SNAPSHOT_PATH)
+                    last_snapshot = time.monotonic()
+            except Exception as e:
+                print(f"[analytics] flush/snapshot error: {e}", flush=True)
+
+    threading.Thread(target=_loop, name="analytics-flush", daemon=True).start()
+
+def make_handler(window: SalesWindow):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status: int, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            qs = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                minutes = int(qs.get("window", window.window))
+                if url.path == "/health":
+                    self._send(200, {"status": "ok", "events": window.events, "skus": len(window.skus)})
+                elif url.path == "/stats":
+                    self._send(200, {"window_min": minutes, **window.totals(minutes)})
+                elif url.path == "/skus":
+                    sort = qs.get("sort", "revenue")
+                    if sort not in SKU_METRICS:
+                        raise ValueError(f"sort must be one of {', '.join(SKU_METRICS)}")
+                    self._send(200, {"window_min": minutes,
+                                     "skus": window.top_skus(minutes, int(qs.get("top", 20)), sort)})
+                elif url.path.startswith("/skus/"):
+                    row = window.sku(unquote(url.path[len("/skus/"):]), minutes)
+                    if row is None:
+                        self._send(404, {"detail": "unknown sku"})
+                    else:
+                        self._send(200, row)
+                else:
+                    self._send(404, {"detail": "not found"})
+            except ValueError as e:
+                self._send(400, {"detail": str(e)})
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+def register(bus, agg: Aggregator):
+    def cb(delivery):
+        try:
+            agg.on_event(delivery.routing_key, delivery.payload)
+        except Exception as e:
+            print(f"[analytics] cb exception: {e}", flush=True)
+        # sayaçlar yaklaşık; snapshot'lar arası kayıp kabul edilebilir
+        delivery.ack()
+
+    bus.subscribe("q.analytics.events", ["order.placed", "payment.completed", "order.out_of_stock"],
+                  cb, prefetch=FLUSH_EVENTS)
+
+def main():
+    window = load_window()
+    agg = Aggregator(window)
+    start_background(agg)
+
+    server = ThreadingHTTPServer(("0.0.0.0", HTTP_PORT), make_handler(window))
+    threading.Thread(target=server.serve_forever, name="analytics-http", daemon=True).start()
+    print(f"[analytics] query endpoint on :{HTTP_PORT}", flush=True)
+
+    bus = create_transport("analytics")
+    register(bus, agg)
+    print("[analytics] listening on order.placed, payment.completed, order.out_of_stock ...", flush=True)
+    bus.run()
+
+if __name__ == "__main__":
+    main()
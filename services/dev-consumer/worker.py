@@ -10,7 +10,9 @@ def main():
 
     qname = "q.dev.tap"
     ch.queue_declare(queue=qname, durable=True)
-    ch.queue_bind(queue=qname, exchange="acme.events", routing_key="order.placed")
+    # öncelikli siparişler lane routing key'leri ile gelir
+    for rk in ("order.placed", "order.placed.express", "order.placed.vip"):
+        ch.queue_bind(queue=qname, exchange="acme.events", routing_key=rk)
 
     print("[dev-consumer] listening on order.placed ...", flush=True)
 
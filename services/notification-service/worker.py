@@ -1,10 +1,9 @@
-import os, json, time
-import pika
+import os
 from contextlib import contextmanager
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
+from transport import create_transport
 
-RABBIT_URL = os.getenv("RABBITMQ_URL")
 DB_URL = os.getenv("DATABASE_URL")
 SERVICE_NAME = "notification-service"
 
@@ -23,9 +22,6 @@ def session_scope():
     finally:
         db.close()
 
-def ensure_exchange(ch):
-    ch.exchange_declare(exchange="acme.events", exchange_type="direct", durable=True)
-
 def already_processed(db, key: str) -> bool:
     row = db.execute(
         text("SELECT 1 FROM processed_events WHERE service_name=:s AND event_id::text=:e"),
@@ -48,9 +44,12 @@ def handle_event(evt_type: str, payload: dict):
         if already_processed(db, order_id):
             return
 
-        row = db.execute(text("SELECT email FROM orders WHERE id::text=:oid"),
-                         {"oid": order_id}).fetchone()
-        email = row[0] if row else "unknown@example.com"
+        email = payload.get("email")
+        if email is None:
+            # v1 event: e-posta payload'da yok
+            row = db.execute(text("SELECT email FROM orders WHERE id=CAST(:oid AS uuid)"),
+                             {"oid": order_id}).fetchone()
+            email = row[0] if row else "unknown@example.com"
 
         if evt_type == "payment.completed":
             fake_send_email(email, "Order Paid", f"Order {order_id} paid successfully.")
@@ -60,48 +59,27 @@ def handle_event(evt_type: str, payload: dict):
             fake_send_email(email, "Out of Stock", f"Order {order_id} is out of stock.")
         mark_processed(db, order_id)
 
-def connect_rabbit_with_retry():
-    while True:
-        try:
-            params = pika.URLParameters(RABBIT_URL)
-            params.heartbeat = 30
-            conn = pika.BlockingConnection(params)
-            ch = conn.channel()
-            ensure_exchange(ch)
-            return conn, ch
-        except Exception as e:
-            print(f"[notification] rabbit connect failed: {e}; retrying...", flush=True)
-            time.sleep(2)
-
-def consume_forever():
-    while True:
-        try:
-            conn, ch = connect_rabbit_with_retry()
-            bindings = [
-                ("q.notification.payment-completed",  "payment.completed"),
-                ("q.notification.payment-failed",     "payment.failed"),
-                ("q.notification.order-out-of-stock", "order.out_of_stock"),
-            ]
-            for q, rk in bindings:
-                ch.queue_declare(queue=q, durable=True)
-                ch.queue_bind(queue=q, exchange="acme.events", routing_key=rk)
+BINDINGS = [
+    ("q.notification.payment-completed",  "payment.completed"),
+    ("q.notification.payment-failed",     "payment.failed"),
+    ("q.notification.order-out-of-stock", "order.out_of_stock"),
+]
 
-            print("[notification] listening ...", flush=True)
+def register(bus):
+    def mk_cb(expected_type):
+        def _cb(delivery):
+            handle_event(expected_type, delivery.payload)
+            delivery.ack()
+        return _cb
 
-            def mk_cb(expected_type):
-                def _cb(ch_, method, props, body):
-                    evt = json.loads(body.decode())
-                    handle_event(expected_type, evt)
-                    ch_.basic_ack(delivery_tag=method.delivery_tag)
-                return _cb
+    for q, rk in BINDINGS:
+        bus.subscribe(q, [rk], mk_cb(rk))
 
-            for q, rk in bindings:
-                ch.basic_consume(queue=q, on_message_callback=mk_cb(rk))
-
-            ch.start_consuming()
-        except Exception as e:
-            print(f"[notification] error: {e}; reconnecting...", flush=True)
-            time.sleep(2)
+def consume_forever():
+    bus = create_transport("notification")
+    register(bus)
+    print("[notification] listening ...", flush=True)
+    bus.run()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,219 @@
+import os, io, csv, sys, json, time, uuid, argparse
+import psycopg2
+from sqlalchemy import text
+from . import database
+
+COLUMNS = ("sku", "name", "price", "stock_qty")
+EVENT_CHUNK = int(os.getenv("CATALOG_EVENT_CHUNK", "1000"))
+LOCK_TIMEOUT = os.getenv("CATALOG_LOCK_TIMEOUT", "5s")
+REPORT_LIMIT = int(os.getenv("CATALOG_REPORT_LIMIT", "100"))
+# boşsa HTTP import kapalı, yalnızca CLI kullanılabilir
+ADMIN_TOKEN = os.getenv("CATALOG_ADMIN_TOKEN", "")
+
+class CatalogImportError(ValueError):
+    pass
+
+class _ChunkReader:
+    """copy_expert için generator'dan okunan file-like nesne."""
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._buf = ""
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buf) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buf += chunk
+        if size < 0:
+            out, self._buf = self._buf, ""
+        else:
+            out, self._buf = self._buf[:size], self._buf[size:]
+        return out
+
+def _ndjson_to_csv(stream, rows_per_chunk: int = 1000):
+    """NDJSON satırlarını COPY'nin okuyacağı CSV parçalarına çevirir (tamamı belleğe alınmaz)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    n = 0
+    for lineno, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError as e:
+            raise CatalogImportError(f"line {lineno}: invalid JSON ({e})")
+        if not isinstance(obj, dict):
+            raise CatalogImportError(f"line {lineno}: expected an object")
+        # boş alan CSV'de NULL olur; COALESCE ile mevcut değer korunur
+        writer.writerow(["" if obj.get(c) is None else obj[c] for c in COLUMNS])
+        n += 1
+        if n % rows_per_chunk == 0:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+def _csv_columns(stream):
+    header = next(csv.reader([stream.readline()]), None)
+    if not header:
+        raise CatalogImportError("CSV header is missing")
+    cols = [c.strip().lower() for c in header]
+    unknown = [c for c in cols if c not in COLUMNS]
+    if unknown or "sku" not in cols or len(set(cols)) != len(cols):
+        raise CatalogImportError(f"CSV header must contain sku and only {', '.join(COLUMNS)}; got {header}")
+    return cols
+
+def import_catalog(fileobj, fmt: str = "csv") -> dict:
+    """
+    fileobj: binary, UTF-8; CSV için ilk satır header (sku zorunlu).
+
+    Katalog/stok feed'ini tek transaction içinde products'a uygular:
+    - COPY ile geçici staging tablosuna akıt
+    - set-based diff: yalnızca değişen SKU'lar dokunulur (kilit süresi kısa kalır)
+    - eksik kolonlar mevcut değeri korur (ör. sadece sku,stock_qty içeren stok feed'i)
+    - değişen SKU'lar için catalog.updated outbox event'leri yaz
+    """
+    if fmt not in ("csv", "ndjson"):
+        raise CatalogImportError(f"unsupported format {fmt!r} (expected csv | ndjson)")
+    stream = io.TextIOWrapper(fileobj, encoding="utf-8", newline="")
+
+    if fmt == "csv":
+        cols, source = _csv_columns(stream), stream
+    else:
+        cols, source = list(COLUMNS), _ChunkReader(_ndjson_to_csv(stream))
+
+    import_id = str(uuid.uuid4())
+    t0 = time.perf_counter()
+    with database.engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TEMP TABLE catalog_staging (
+              seq BIGSERIAL,
+              sku TEXT,
+              name TEXT,
+              price NUMERIC(12,2),
+              stock_qty INT
+            ) ON COMMIT DROP
+        """))
+        cur = conn.connection.cursor()
+        try:
+            cur.copy_expert(f"COPY catalog_staging ({', '.join(cols)}) FROM STDIN WITH (FORMAT csv)", source)
+        except psycopg2.DataError as e:
+            raise CatalogImportError(f"invalid catalog data: {e}".strip())
+        finally:
+            cur.close()
+
+        # feed içinde aynı SKU birden fazla ise son satır kazanır
+        conn.execute(text("""
+            CREATE TEMP TABLE catalog_changes ON COMMIT DROP AS
+            WITH src AS (
+                SELECT DISTINCT ON (sku) sku, name, price, stock_qty
+                  FROM catalog_staging
+                 WHERE sku IS NOT NULL AND sku <> ''
+              ORDER BY sku, seq DESC
+            )
+            SELECT s.sku, s.name, s.price, s.stock_qty,
+                   p.sku IS NULL AS is_new,
+                   p.price AS old_price, p.stock_qty AS old_stock_qty,
+                   COALESCE((p.sku IS NULL AND (s.name IS NULL OR s.price IS NULL))
+                            OR s.price < 0 OR s.stock_qty < 0, false) AS rejected
+              FROM src s
+         LEFT JOIN products p ON p.sku = s.sku
+             WHERE p.sku IS NULL
+                OR s.name <> p.name
+                OR s.price <> p.price
+                OR s.stock_qty <> p.stock_qty
+        """))
+        totals = conn.execute(text("""
+            SELECT (SELECT count(*) FROM catalog_staging) AS rows_read,
+                   (SELECT count(DISTINCT sku) FROM catalog_staging WHERE sku IS NOT NULL AND sku <> '') AS skus,
+                   count(*) FILTER (WHERE rejected) AS rejected,
+                   count(*) FILTER (WHERE NOT rejected AND is_new) AS inserted,
+                   count(*) FILTER (WHERE NOT rejected AND NOT is_new) AS updated,
+                   count(*) FILTER (WHERE NOT rejected AND NOT is_new AND price <> old_price) AS price_changed,
+                   count(*) FILTER (WHERE NOT rejected AND NOT is_new AND stock_qty <> old_stock_qty) AS stock_changed
+              FROM catalog_changes
+        """)).mappings().one()
+        changes = conn.execute(text("""
+            SELECT sku, is_new, old_price, price, old_stock_qty, stock_qty
+              FROM catalog_changes
+             WHERE NOT rejected
+          ORDER BY sku
+             LIMIT :lim
+        """), {"lim": REPORT_LIMIT}).mappings().all()
+        rejected = conn.execute(text("""
+            SELECT sku FROM catalog_changes WHERE rejected ORDER BY sku LIMIT :lim
+        """), {"lim": REPORT_LIMIT}).scalars().all()
+
+        # kilitler yalnızca buradan commit'e kadar tutulur; canlı trafikle çakışırsa beklemeden vazgeç
+        conn.execute(text("SELECT set_config('lock_timeout', :t, true)"), {"t": LOCK_TIMEOUT})
+        # stok/fiyat gelmediyse güncel değer korunur (eşzamanlı rezervasyonu ezmemek için)
+        conn.execute(text("""
+            UPDATE products p
+               SET name = COALESCE(c.name, p.name),
+                   price = COALESCE(c.price, p.price),
+                   stock_qty = COALESCE(c.stock_qty, p.stock_qty)
+              FROM catalog_changes c
+             WHERE p.sku = c.sku AND NOT c.is_new AND NOT c.rejected
+        """))
+        conn.execute(text("""
+            INSERT INTO products (sku, name, price, stock_qty)
+            SELECT sku, name, price, COALESCE(stock_qty, 0)
+              FROM catalog_changes
+             WHERE is_new AND NOT rejected
+            ON CONFLICT (sku) DO NOTHING
+        """))
+
+        # cache invalidation: değişen SKU'lar CATALOG_EVENT_CHUNK'lık catalog.updated event'lerinde
+        events = conn.execute(text("""
+            WITH numbered AS (
+                SELECT sku, (row_number() OVER (ORDER BY sku) - 1) / :chunk AS grp
+                  FROM catalog_changes
+                 WHERE NOT rejected
+            ), grouped AS (
+                SELECT gen_random_uuid() AS event_id, jsonb_agg(sku ORDER BY sku) AS skus
+                  FROM numbered
+              GROUP BY grp
+            )
+            INSERT INTO event_outbox (event_type, event_id, version, payload)
+            SELECT 'catalog.updated', event_id, 2,
+                   jsonb_build_object('schema_version', 2,
+                                      'event_id', event_id::text,
+                                      'correlation_id', CAST(:import_id AS text),
+                                      'skus', skus)
+              FROM grouped
+        """), {"chunk": EVENT_CHUNK, "import_id": import_id}).rowcount
+
+    report = dict(totals)
+    report["unchanged"] = report["skus"] - report["inserted"] - report["updated"] - report["rejected"]
+    report.update(
+        import_id=import_id,
+        events=events,
+        elapsed_ms=round((time.perf_counter() - t0) * 1000, 1),
+        changes=[{k: (float(v) if k in ("price", "old_price") and v is not None else v) for k, v in c.items()}
+                 for c in changes],
+        rejected_skus=rejected,
+    )
+    return report
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Bulk import products (CSV or NDJSON) via COPY")
+    p.add_argument("path", help="file to import, or - for stdin")
+    p.add_argument("--format", choices=("csv", "ndjson"),
+                   help="defaults to ndjson for .ndjson/.jsonl files, csv otherwise")
+    args = p.parse_args(argv)
+
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    try:
+        if args.path == "-":
+            report = import_catalog(sys.stdin.buffer, fmt)
+        else:
+            with open(args.path, "rb") as f:
+                report = import_catalog(f, fmt)
+    except ValueError as e:  # CatalogImportError ve geçersiz UTF-8 (UnicodeDecodeError)
+        sys.exit(f"[catalog] import failed: {e}")
+    print(json.dumps(report, indent=2, default=str))
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,36 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from . import models
 from uuid import uuid4
+import os
 from decimal import Decimal
+from datetime import datetime, timedelta, timezone
 
-def create_order_with_outbox(db: Session, order_data):
+CURRENCY = os.getenv("ORDER_CURRENCY", "TRY")
+EVENT_SCHEMA_VERSION = 2
+
+def order_response(order_id, status: str) -> dict:
+    return {"order_id": str(order_id), "status": status}
+
+def create_order_with_outbox(db: Session, order_data, idempotency_key: str = None,
+                             request_hash: str = None, idempotency_ttl_sec: int = None):
     """
     Tek transaction içinde:
     - orders / order_items ekle
     - event_outbox'a order.placed kaydet
+    - idempotency_key verildiyse anahtarı ve cevabı kaydet (replay için);
+      bu durumda request_hash ve idempotency_ttl_sec zorunlu
     """
+    if idempotency_key is not None and (request_hash is None or idempotency_ttl_sec is None):
+        raise TypeError("idempotency_key requires request_hash and idempotency_ttl_sec")
+
     total_amount = Decimal("0.00")
+    prices = {}
     for item in order_data.items:
         product = db.query(models.Product).filter(models.Product.sku == item.sku).first()
         if not product:
             raise ValueError(f"Product {item.sku} not found")
+        prices[item.sku] = product.price
         total_amount += product.price * item.qty
 
     order_id = uuid4()
@@ -23,32 +40,59 @@ def create_order_with_outbox(db: Session, order_data):
         email=order_data.email,
         status="placed",
         total_amount=total_amount,
+        priority=order_data.priority,
     )
     db.add(order)
 
     for item in order_data.items:
-        product = db.query(models.Product).filter(models.Product.sku == item.sku).first()
         db.add(models.OrderItem(
             order_id=order_id,
             sku=item.sku,
             qty=item.qty,
-            unit_price=product.price,
+            unit_price=prices[item.sku],
         ))
 
-    # outbox event
+    # outbox event: downstream servisler siparişi bu payload'dan okur (bkz. shared/events.py)
+    event_id = uuid4()
     payload = {
+        "schema_version": EVENT_SCHEMA_VERSION,
+        "event_id": str(event_id),
+        "causation_id": None,
+        "correlation_id": str(order_id),
         "order_id": str(order_id),
         "customer_id": order_data.customer_id,
         "email": order_data.email,
-        "items": [item.dict() for item in order_data.items],
+        "items": [
+            {"sku": item.sku, "qty": item.qty, "unit_price": float(prices[item.sku])}
+            for item in order_data.items
+        ],
         "total_amount": float(total_amount),
+        "currency": CURRENCY,
+        "priority": order_data.priority,
     }
     outbox = models.EventOutbox(
         event_type="order.placed",
+        event_id=event_id,
+        version=EVENT_SCHEMA_VERSION,
         payload=payload,
     )
     db.add(outbox)
 
+    if idempotency_key is not None:
+        # süresi dolmuş ama sweeper'ın henüz silmediği kayıt PK'yı tutmasın
+        db.query(models.IdempotencyKey).filter(
+            models.IdempotencyKey.key == idempotency_key,
+            models.IdempotencyKey.expires_at <= func.now(),
+        ).delete(synchronize_session=False)
+        # aynı anahtarla eşzamanlı ikinci istek PK üzerinde bekler, sonra IntegrityError alır
+        db.add(models.IdempotencyKey(
+            key=idempotency_key,
+            request_hash=request_hash,
+            order_id=order_id,
+            response=order_response(order_id, order.status),
+            expires_at=datetime.now(timezone.utc) + timedelta(seconds=idempotency_ttl_sec),
+        ))
+
     db.commit()
     db.refresh(order)
     return order
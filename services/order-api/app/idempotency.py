@@ -0,0 +1,157 @@
+import os, json, time, hashlib, threading
+from collections import OrderedDict
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from . import database
+
+TTL_SEC = int(os.getenv("IDEMPOTENCY_TTL_SEC", "86400"))
+CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+SWEEP_SEC = float(os.getenv("IDEMPOTENCY_SWEEP_SEC", "300"))
+SWEEP_BATCH = int(os.getenv("IDEMPOTENCY_SWEEP_BATCH", "5000"))
+WAIT_SEC = float(os.getenv("IDEMPOTENCY_WAIT_SEC", "10"))
+MAX_KEY_LEN = 255
+
+class IdempotencyConflict(Exception):
+    """Aynı Idempotency-Key farklı bir request body ile tekrar kullanıldı."""
+
+def request_fingerprint(order_data) -> str:
+    raw = json.dumps(order_data.dict(), sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """Süreç içi, boyutu sınırlı LRU: key -> (request_hash, response, expires_at)."""
+
+    def __init__(self, max_size: int, ttl_sec: int):
+        self.max_size = max_size
+        self.ttl_sec = ttl_sec
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= time.monotonic():
+                del self._items[key]
+                return None
+            self._items.move_to_end(key)
+            return entry[0], entry[1]
+
+    def put(self, key: str, request_hash: str, response: dict, ttl_sec: float = None):
+        expires_at = time.monotonic() + (self.ttl_sec if ttl_sec is None else ttl_sec)
+        with self._lock:
+            self._items[key] = (request_hash, response, expires_at)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def purge_expired(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, v in self._items.items() if v[2] <= now]
+            for k in expired:
+                del self._items[k]
+        return len(expired)
+
+cache = ResponseCache(CACHE_SIZE, TTL_SEC)
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+def _check(key: str, request_hash: str, stored_hash: str, response: dict) -> dict:
+    if stored_hash != request_hash:
+        raise IdempotencyConflict(f"Idempotency-Key {key} was already used with a different request body")
+    return response
+
+def _lookup_db(db: Session, key: str):
+    row = db.execute(text("""
+        SELECT request_hash, response,
+               EXTRACT(EPOCH FROM (expires_at - NOW())) AS ttl
+          FROM idempotency_keys
+         WHERE key=:k AND expires_at > NOW()
+    """), {"k": key}).fetchone()
+    if row is None:
+        return None
+    cache.put(key, row.request_hash, row.response, ttl_sec=float(row.ttl))
+    return row.request_hash, row.response
+
+def run_once(db: Session, key: str, request_hash: str, create):
+    """
+    create(db) siparişi oluşturur ve anahtarı aynı transaction'da kaydeder.
+    Dönüş: (response, replayed)
+    - tekrar eden istekler cache'ten (yoksa DB'den) cevaplanır
+    - aynı süreçteki eşzamanlı kopyalar uçuştaki isteği bekler
+    - farklı süreçteki eşzamanlı kopya PK çakışmasıyla DB'den cevaplanır
+    """
+    deadline = time.monotonic() + WAIT_SEC
+    while True:
+        hit = cache.get(key)
+        if hit:
+            return _check(key, request_hash, *hit), True
+
+        with _inflight_lock:
+            done = _inflight.get(key)
+            leader = done is None
+            if leader:
+                done = _inflight[key] = threading.Event()
+
+        if not leader:
+            # ilk istek bitene kadar bekle; başarısız olduysa biz deneriz
+            done.wait(max(deadline - time.monotonic(), 0))
+            if not done.is_set():
+                raise TimeoutError(f"Idempotency-Key {key} is still being processed")
+            continue
+
+        try:
+            hit = _lookup_db(db, key)
+            if hit:
+                return _check(key, request_hash, *hit), True
+            try:
+                response = create(db)
+            except IntegrityError:
+                db.rollback()
+                hit = _lookup_db(db, key)
+                if hit is None:
+                    raise
+                return _check(key, request_hash, *hit), True
+            cache.put(key, request_hash, response)
+            return response, False
+        finally:
+            with _inflight_lock:
+                _inflight.pop(key, None)
+            done.set()
+
+def sweep_expired() -> int:
+    """Süresi dolan anahtarları küçük partiler halinde siler (uzun kilit tutmadan)."""
+    deleted = 0
+    while True:
+        with database.SessionLocal() as db:
+            n = db.execute(text("""
+                DELETE FROM idempotency_keys
+                 WHERE key IN (
+                       SELECT key FROM idempotency_keys
+                        WHERE expires_at <= NOW()
+                        LIMIT :lim
+                   FOR UPDATE SKIP LOCKED)
+            """), {"lim": SWEEP_BATCH}).rowcount
+            db.commit()
+        deleted += n
+        if n < SWEEP_BATCH:
+            break
+    cache.purge_expired()
+    return deleted
+
+def start_sweeper(stop: threading.Event) -> threading.Thread:
+    def _loop():
+        while not stop.wait(SWEEP_SEC):
+            try:
+                n = sweep_expired()
+                if n:
+                    print(f"[order-api] swept {n} expired idempotency keys", flush=True)
+            except Exception as e:
+                print(f"[order-api] idempotency sweep failed: {e}", flush=True)
+
+    t = threading.Thread(target=_loop, name="idempotency-sweeper", daemon=True)
+    t.start()
+    return t
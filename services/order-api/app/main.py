@@ -1,13 +1,83 @@
-from fastapi import FastAPI, Depends, HTTPException
+import hmac, threading, tempfile
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError, OperationalError
 from sqlalchemy.orm import Session
-from . import database, schemas, crud
+from . import database, schemas, crud, idempotency, catalog
 
-app = FastAPI(title="Order API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    stop = threading.Event()
+    idempotency.start_sweeper(stop)
+    yield
+    stop.set()
+
+app = FastAPI(title="Order API", lifespan=lifespan)
 
 @app.post("/orders")
-def create_order(order: schemas.OrderCreate, db: Session = Depends(database.get_db)):
+def create_order(order: schemas.OrderCreate, response: Response,
+                 db: Session = Depends(database.get_db),
+                 idempotency_key: Optional[str] = Header(default=None)):
+    try:
+        if idempotency_key is None:
+            new_order = crud.create_order_with_outbox(db, order)
+            return crud.order_response(new_order.id, new_order.status)
+
+        if not idempotency_key or len(idempotency_key) > idempotency.MAX_KEY_LEN:
+            raise HTTPException(status_code=400, detail="Invalid Idempotency-Key")
+
+        request_hash = idempotency.request_fingerprint(order)
+
+        def create(db_):
+            new_order = crud.create_order_with_outbox(
+                db_, order,
+                idempotency_key=idempotency_key,
+                request_hash=request_hash,
+                idempotency_ttl_sec=idempotency.TTL_SEC,
+            )
+            return crud.order_response(new_order.id, new_order.status)
+
+        body, replayed = idempotency.run_once(db, idempotency_key, request_hash, create)
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+        return body
+    except idempotency.IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except TimeoutError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail=f"Idempotency-Key {idempotency_key} conflicts with a concurrent request; retry")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def require_catalog_admin(authorization: Optional[str] = Header(default=None)):
+    # fiyat/stok yazan uç: public API portunda yalnızca admin token ile
+    if not catalog.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="catalog import over HTTP is disabled; set CATALOG_ADMIN_TOKEN or use the CLI")
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), catalog.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="invalid admin token", headers={"WWW-Authenticate": "Bearer"})
+
+@app.post("/catalog/import", dependencies=[Depends(require_catalog_admin)])
+async def import_catalog(request: Request, fmt: Optional[str] = Query(default=None, alias="format")):
+    """CSV (header satırı ile) veya NDJSON gövdesini COPY ile products'a uygular."""
+    if fmt is None:
+        content_type = request.headers.get("content-type", "")
+        fmt = "ndjson" if "ndjson" in content_type or "jsonl" in content_type else "csv"
+
+    # gövde diske taşabilir; COPY senkron olduğu için threadpool'da çalışır
+    spool = tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024)
     try:
-        new_order = crud.create_order_with_outbox(db, order)
-        return {"order_id": str(new_order.id), "status": new_order.status}
+        async for chunk in request.stream():
+            spool.write(chunk)
+        spool.seek(0)
+        return await run_in_threadpool(catalog.import_catalog, spool, fmt)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+    except OperationalError as e:
+        # ör. lock_timeout: sıcak SKU'lar canlı trafikte kilitli
+        raise HTTPException(status_code=503, detail=f"catalog import aborted, retry later: {e.orig}")
+    finally:
+        spool.close()
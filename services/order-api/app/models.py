@@ -18,6 +18,7 @@ class Order(Base):
     email = Column(String, nullable=False)
     status = Column(String, nullable=False)
     total_amount = Column(Numeric(12,2), nullable=False)
+    priority = Column(String, nullable=False, server_default="standard")
     created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"))
     items = relationship("OrderItem", back_populates="order")
 
@@ -40,3 +41,12 @@ class EventOutbox(Base):
     payload = Column(JSON, nullable=False)
     published_at = Column(TIMESTAMP(timezone=True), nullable=True)
     status = Column(String, nullable=False, server_default="NEW")
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    key = Column(String, primary_key=True)
+    request_hash = Column(String, nullable=False)
+    order_id = Column(UUID(as_uuid=True), ForeignKey("orders.id", ondelete="CASCADE"), nullable=True)
+    response = Column(JSON, nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"))
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False)
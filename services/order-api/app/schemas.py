@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import List
+from typing import List, Literal
 
 class OrderItemCreate(BaseModel):
     sku: str
@@ -9,3 +9,4 @@ class OrderCreate(BaseModel):
     customer_id: str
     email: EmailStr
     items: List[OrderItemCreate]
+    priority: Literal["standard", "express", "vip"] = "standard"
@@ -1,12 +1,13 @@
-import os, json, random, time
-import pika
+import os, time, random
 from contextlib import contextmanager
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker
+from transport import create_transport, UnroutableError
+from events import derive
 
-RABBIT_URL = os.getenv("RABBITMQ_URL")
 DB_URL = os.getenv("DATABASE_URL")
 SERVICE_NAME = "payment-service"
+UNROUTABLE_RETRY_SEC = float(os.getenv("UNROUTABLE_RETRY_SEC", "1"))
 
 engine = create_engine(DB_URL, pool_pre_ping=True)
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
@@ -23,17 +24,8 @@ def session_scope():
     finally:
         db.close()
 
-def ensure_exchange(ch):
-    ch.exchange_declare(exchange="acme.events", exchange_type="direct", durable=True)
-
-def publish(ch, event_type: str, payload: dict):
-    body = json.dumps(payload).encode("utf-8")
-    ch.basic_publish(
-        exchange="acme.events",
-        routing_key=event_type,
-        body=body,
-        properties=pika.BasicProperties(content_type="application/json", delivery_mode=2),
-    )
+def publish(bus, event_type: str, payload: dict):
+    bus.publish(event_type, payload)
 
 def already_processed(db, key: str) -> bool:
     row = db.execute(
@@ -48,7 +40,11 @@ def mark_processed(db, key: str):
         {"s": SERVICE_NAME, "e": key},
     )
 
-def handle_inventory_reserved(ch, db, evt: dict):
+def order_amount(evt: dict):
+    # v2 event tutarı taşır; v1 (yalnızca order_id) için tutar bilinmiyor, yalnızca log'da kullanılır
+    return evt.get("total_amount"), evt.get("currency")
+
+def handle_inventory_reserved(bus, db, evt: dict):
     order_id = evt["order_id"]
     print(f"[payment] processing order_id={order_id}", flush=True)
 
@@ -56,72 +52,42 @@ def handle_inventory_reserved(ch, db, evt: dict):
         print(f"[payment] skip already processed order_id={order_id}", flush=True)
         return
 
+    amount, currency = order_amount(evt)
     success = random.random() < float(os.getenv("PAYMENT_SUCCESS_RATE", "0.9"))
 
     if success:
-        db.execute(text("UPDATE orders SET status='paid' WHERE id::text=:oid"), {"oid": order_id})
+        db.execute(text("UPDATE orders SET status='paid' WHERE id=CAST(:oid AS uuid)"), {"oid": order_id})
         mark_processed(db, order_id)
-        publish(ch, "payment.completed", {"order_id": order_id})
-        print(f"[payment] COMPLETED order_id={order_id}", flush=True)
+        publish(bus, "payment.completed", derive(evt))
+        print(f"[payment] COMPLETED order_id={order_id} amount={amount} {currency or ''}", flush=True)
     else:
-        db.execute(text("UPDATE orders SET status='payment_failed' WHERE id::text=:oid"), {"oid": order_id})
+        db.execute(text("UPDATE orders SET status='payment_failed' WHERE id=CAST(:oid AS uuid)"), {"oid": order_id})
         mark_processed(db, order_id)
-        publish(ch, "payment.failed", {"order_id": order_id, "reason": "card_declined"})
-        print(f"[payment] FAILED order_id={order_id}", flush=True)
+        publish(bus, "payment.failed", derive(evt, reason="card_declined"))
+        print(f"[payment] FAILED order_id={order_id} amount={amount} {currency or ''}", flush=True)
 
-def connect_rabbit_with_retry(max_wait=60):
-    attempt = 0
-    while True:
+def register(bus):
+    def cb(delivery):
         try:
-            params = pika.URLParameters(RABBIT_URL)
-            params.heartbeat = 30
-            params.blocked_connection_timeout = 300
-            params.connection_attempts = 5
-            params.retry_delay = 2
-            conn = pika.BlockingConnection(params)
-            ch = conn.channel()
-            ensure_exchange(ch)
-            return conn, ch
+            with session_scope() as db:
+                handle_inventory_reserved(bus, db, delivery.payload)
+        except UnroutableError as e:
+            # downstream kuyruğu henüz tanımlı değil; transaction geri alındı, mesaj tekrar denensin
+            print(f"[payment] {e}; requeueing order_id={delivery.payload.get('order_id')}", flush=True)
+            time.sleep(UNROUTABLE_RETRY_SEC)
+            delivery.nack(requeue=True)
+            return
         except Exception as e:
-            attempt += 1
-            sleep = min(2 ** attempt, max_wait)
-            print(f"[payment] rabbit connect failed: {e}; retrying in {sleep}s", flush=True)
-            time.sleep(sleep)
+            print(f"[payment] cb exception: {e}", flush=True)
+        delivery.ack()
 
-def consume_forever():
-    while True:
-        try:
-            conn, ch = connect_rabbit_with_retry()
-            qname = "q.payment.inventory-reserved"
-            ch.queue_declare(queue=qname, durable=True)
-            ch.queue_bind(queue=qname, exchange="acme.events", routing_key="inventory.reserved")
+    bus.subscribe("q.payment.inventory-reserved", ["inventory.reserved"], cb, prefetch=10, lanes=True)
 
-            print("[payment] listening on inventory.reserved ...", flush=True)
-
-            def cb(ch_, method, props, body):
-                try:
-                    evt = json.loads(body.decode())
-                    with session_scope() as db:
-                        handle_inventory_reserved(ch_, db, evt)
-                    ch_.basic_ack(delivery_tag=method.delivery_tag)
-                except Exception as e:
-                    print(f"[payment] cb exception: {e}", flush=True)
-                    ch_.basic_ack(delivery_tag=method.delivery_tag)
-
-            ch.basic_qos(prefetch_count=10)
-            ch.basic_consume(queue=qname, on_message_callback=cb)
-            ch.start_consuming()
-        except Exception as e:
-            print(f"[payment] consuming error: {e}; reconnecting...", flush=True)
-            try:
-                ch.close()
-            except:
-                pass
-            try:
-                conn.close()
-            except:
-                pass
-            time.sleep(2)
+def consume_forever():
+    bus = create_transport("payment")
+    register(bus)
+    print("[payment] listening on inventory.reserved ...", flush=True)
+    bus.run()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,35 @@
+"""
+Event payloads (schema_version 2).
+
+order.placed carries the order context; every downstream event copies it so
+consumers read the order from the event instead of querying `orders`:
+
+    {
+      "schema_version": 2,
+      "event_id": "...",                # this event
+      "causation_id": "...",            # event_id of the event that caused it
+      "correlation_id": "<order_id>",   # same for the whole order flow
+      "order_id": "...", "customer_id": "...", "email": "...",
+      "total_amount": 199.9, "currency": "TRY",
+      "priority": "standard",           # vip | express | standard (transport lane)
+      "items": [{"sku": "...", "qty": 1, "unit_price": 199.9}],
+      ...event-specific fields (e.g. "reason")
+    }
+
+Version 1 events (order_id only) may still be in flight; consumers fall back
+to the database when a field is missing.
+"""
+import uuid
+
+SCHEMA_VERSION = 2
+CONTEXT_FIELDS = ("order_id", "customer_id", "email", "total_amount", "currency", "items", "priority")
+
+def derive(parent: dict, **fields) -> dict:
+    """parent event'in sipariş bağlamını taşıyan yeni bir downstream payload üretir."""
+    payload = {k: parent[k] for k in CONTEXT_FIELDS if k in parent}
+    payload["schema_version"] = SCHEMA_VERSION
+    payload["event_id"] = str(uuid.uuid4())
+    payload["causation_id"] = parent.get("event_id")
+    payload["correlation_id"] = parent.get("correlation_id") or parent.get("order_id")
+    payload.update(fields)
+    return payload
@@ -0,0 +1,466 @@
+"""
+Event transport shared by the publisher and all workers.
+
+    bus = create_transport("inventory-service")
+    bus.subscribe("q.inventory.order-placed", ["order.placed"], on_message, prefetch=10, lanes=True)
+    bus.publish("inventory.reserved", {"order_id": ..., "priority": "vip"})
+    bus.run()
+
+publish() raises UnroutableError when no queue is bound for the event (on
+AMQP only with publisher confirms). A producer that must not lose events
+declares the queues it feeds with declare(); they then hold messages until
+their consumer subscribes.
+
+EVENT_TRANSPORT selects the backend:
+- amqp   (default) RabbitMQ via pika, direct exchange `acme.events`, publisher confirms
+- inproc in-process queues; every service in the process shares one instance,
+         which lets the API, publisher and workers run together without a broker
+
+Priority lanes: an event is published on the lane named by its payload's
+`priority` (vip | express | standard). On AMQP, non-standard lanes use the
+routing key `<event_type>.<lane>`. A subscription with lanes=True gets one
+queue per lane (`<queue>` for standard, `<queue>.<lane>` otherwise) and
+picks the next message by smooth weighted round-robin over the non-empty
+lanes (LANE_WEIGHTS), so priority traffic skips the standard backlog
+without starving it. Other subscriptions get every lane on one queue.
+"""
+import os, json, time, threading
+from collections import deque, defaultdict
+
+EXCHANGE = "acme.events"
+PRIORITY_LANES = ("vip", "express", "standard")
+DEFAULT_LANE = "standard"
+
+class UnroutableError(Exception):
+    """Event için bağlı kuyruk yok; mesaj hiçbir yere iletilmedi."""
+
+def _parse_weights(raw: str) -> dict:
+    weights = {lane: 1 for lane in PRIORITY_LANES}
+    for part in raw.split(","):
+        if part.strip():
+            lane, _, w = part.partition("=")
+            weights[lane.strip()] = max(1, int(w))
+    return weights
+
+LANE_WEIGHTS = _parse_weights(os.getenv("LANE_WEIGHTS", "vip=6,express=3,standard=1"))
+
+def lane_of(payload: dict) -> str:
+    lane = payload.get("priority") if isinstance(payload, dict) else None
+    return lane if lane in PRIORITY_LANES else DEFAULT_LANE
+
+def lane_routing_key(event_type: str, lane: str) -> str:
+    return event_type if lane == DEFAULT_LANE else f"{event_type}.{lane}"
+
+def base_event_type(routing_key: str) -> str:
+    head, _, tail = routing_key.rpartition(".")
+    return head if head and tail in PRIORITY_LANES and tail != DEFAULT_LANE else routing_key
+
+class LaneScheduler:
+    """Smooth weighted round-robin: her seçimde ağırlık kadar kredi; kazanan toplamı öder."""
+
+    def __init__(self, weights: dict):
+        self.weights = weights
+        self.current = defaultdict(int)
+
+    def pick(self, ready):
+        total, best = 0, None
+        for lane in ready:
+            w = self.weights.get(lane, 1)
+            self.current[lane] += w
+            total += w
+            if best is None or self.current[lane] > self.current[best]:
+                best = lane
+        if best is not None:
+            self.current[best] -= total
+        return best
+
+class Delivery:
+    """Tek bir mesaj; handler işini bitirince ack() ya da nack() çağırır."""
+    __slots__ = ("routing_key", "payload", "_ack", "_nack")
+
+    def __init__(self, routing_key: str, payload: dict, ack, nack):
+        self.routing_key = routing_key   # lane eki olmadan event tipi
+        self.payload = payload
+        self._ack = ack
+        self._nack = nack
+
+    def ack(self):
+        self._ack()
+
+    def nack(self, requeue: bool = False):
+        self._nack(requeue)
+
+class Subscription:
+    """Bir consumer: lane başına bir buffer ve buffer'lar arasında ağırlıklı seçim."""
+
+    def __init__(self, queue: str, routing_keys, handler, prefetch: int, lanes: bool):
+        self.queue = queue
+        self.routing_keys = list(routing_keys)
+        self.handler = handler
+        self.prefetch = max(1, prefetch)
+        self.lanes = PRIORITY_LANES if lanes else (DEFAULT_LANE,)
+        self.buffers = {lane: deque() for lane in self.lanes}
+        self.scheduler = LaneScheduler(LANE_WEIGHTS)
+        self.cond = None
+
+    def queue_for(self, lane: str) -> str:
+        return self.queue if lane == DEFAULT_LANE else f"{self.queue}.{lane}"
+
+    def bindings_for(self, lane: str):
+        # lane'siz subscription tüm lane'leri tek kuyrukta toplar
+        lanes = PRIORITY_LANES if len(self.lanes) == 1 else (lane,)
+        return [lane_routing_key(rk, l) for rk in self.routing_keys for l in lanes]
+
+    def buffer_for(self, lane: str) -> deque:
+        buffer = self.buffers.get(lane)
+        return self.buffers[DEFAULT_LANE] if buffer is None else buffer
+
+    def buffered(self) -> int:
+        return sum(len(b) for b in self.buffers.values())
+
+    def next(self):
+        ready = [lane for lane in self.lanes if self.buffers[lane]]
+        if not ready:
+            return None
+        return self.buffers[self.scheduler.pick(ready)].popleft()
+
+class Transport:
+    name = "service"
+
+    def publish(self, event_type: str, payload: dict, mandatory: bool = True):
+        """
+        Mesaj broker tarafından kabul edilene kadar bekler; kabul edilmezse exception.
+        Bağlı kuyruk yoksa UnroutableError (bağlantı hatası değil, reconnect gerekmez);
+        mandatory=False ile dinleyeni olmayan mesaj sessizce düşer (broadcast event'ler).
+        """
+        raise NotImplementedError
+
+    def declare(self, queue: str, routing_keys, lanes: bool = False):
+        """Kuyruğu consume etmeden tanımlar; consumer subscribe olana kadar mesajları tutar."""
+        raise NotImplementedError
+
+    def subscribe(self, queue: str, routing_keys, handler, prefetch: int = 10, lanes: bool = False):
+        """
+        handler(Delivery) her mesaj için çağrılır; lane başına en fazla `prefetch`
+        mesaj ack bekleyebilir. lanes=True öncelik lane'lerini ayrı kuyruklarda tüketir.
+        """
+        raise NotImplementedError
+
+    def run(self):
+        """Mesajları tüketir; close() çağrılana kadar döner."""
+        raise NotImplementedError
+
+    def reconnect(self):
+        pass
+
+    def close(self):
+        pass
+
+# ---------------------------------------------------------------------------
+# AMQP (RabbitMQ)
+# ---------------------------------------------------------------------------
+
+class AmqpTransport(Transport):
+    def __init__(self, url: str, name: str = "service", confirm: bool = True, max_wait_sec: int = 60):
+        self.url = url
+        self.name = name
+        self.confirm = confirm
+        self.max_wait_sec = max_wait_sec
+        self._subs = []
+        self._decls = []
+        self._conn = None
+        self._ch = None
+        self._closed = False
+
+    def connect(self):
+        import pika
+        attempt = 0
+        while True:
+            try:
+                params = pika.URLParameters(self.url)
+                # bağlantı dayanıklılığı
+                params.heartbeat = 30
+                params.blocked_connection_timeout = 300
+                params.connection_attempts = 5
+                params.retry_delay = 2
+
+                self._conn = pika.BlockingConnection(params)
+                self._ch = self._conn.channel()
+                self._ch.exchange_declare(exchange=EXCHANGE, exchange_type="direct", durable=True)
+                if self.confirm:
+                    # confirm modunda basic_publish nack'te NackError, mandatory ile
+                    # hiçbir kuyruğa yönlenmeyen mesajda UnroutableError fırlatır
+                    self._ch.confirm_delivery()
+                for decl in self._decls:
+                    self._declare_queues(decl)
+                for sub in self._subs:
+                    self._declare(sub)
+                return
+            except Exception as e:
+                attempt += 1
+                sleep = min(2 ** attempt, self.max_wait_sec)
+                print(f"[{self.name}] RabbitMQ connect failed ({e}); retrying in {sleep}s", flush=True)
+                time.sleep(sleep)
+
+    def _channel(self):
+        if self._ch is None or not self._ch.is_open:
+            self.connect()
+        return self._ch
+
+    def publish(self, event_type: str, payload: dict, mandatory: bool = True):
+        import pika
+        from pika.exceptions import UnroutableError as _Unroutable
+        routing_key = lane_routing_key(event_type, lane_of(payload))
+        try:
+            self._channel().basic_publish(
+                exchange=EXCHANGE,
+                routing_key=routing_key,
+                body=json.dumps(payload).encode("utf-8"),
+                properties=pika.BasicProperties(content_type="application/json", delivery_mode=2),
+                mandatory=mandatory,
+            )
+        except _Unroutable:
+            raise UnroutableError(f"no queue bound for {routing_key}")
+
+    def declare(self, queue: str, routing_keys, lanes: bool = False):
+        decl = Subscription(queue, routing_keys, None, 1, lanes)
+        self._decls.append(decl)
+        if self._ch is not None and self._ch.is_open:
+            self._declare_queues(decl)
+
+    def subscribe(self, queue: str, routing_keys, handler, prefetch: int = 10, lanes: bool = False):
+        sub = Subscription(queue, routing_keys, handler, prefetch, lanes)
+        self._subs.append(sub)
+        if self._ch is not None and self._ch.is_open:
+            self._declare(sub)
+
+    def _declare_queues(self, sub: Subscription):
+        for lane in sub.lanes:
+            queue = sub.queue_for(lane)
+            self._ch.queue_declare(queue=queue, durable=True)
+            for rk in sub.bindings_for(lane):
+                self._ch.queue_bind(queue=queue, exchange=EXCHANGE, routing_key=rk)
+
+    def _declare(self, sub: Subscription):
+        ch = self._ch
+        self._declare_queues(sub)
+        for lane in sub.lanes:
+            # eski kanalın delivery tag'leri geçersiz
+            sub.buffers[lane].clear()
+            queue = sub.queue_for(lane)
+
+            def _cb(ch_, method, props, body, buffer=sub.buffers[lane]):
+                tag = method.delivery_tag
+                try:
+                    payload = json.loads(body.decode())
+                except Exception as e:
+                    print(f"[{self.name}] dropping undecodable message rk={method.routing_key}: {e}", flush=True)
+                    ch_.basic_nack(delivery_tag=tag, requeue=False)
+                    return
+                # handler burada çağrılmaz; run() lane ağırlığına göre buffer'dan seçer
+                buffer.append(Delivery(
+                    base_event_type(method.routing_key), payload,
+                    lambda: ch_.basic_ack(delivery_tag=tag),
+                    lambda requeue: ch_.basic_nack(delivery_tag=tag, requeue=requeue),
+                ))
+
+            # global=False: prefetch bu kanalda sonradan açılan her consumer için ayrı uygulanır
+            ch.basic_qos(prefetch_count=sub.prefetch)
+            ch.basic_consume(queue=queue, on_message_callback=_cb)
+
+    def _dispatch(self) -> bool:
+        """Her subscription'dan en fazla bir mesaj işler; işlenen olduysa True."""
+        handled = False
+        for sub in self._subs:
+            delivery = sub.next()
+            if delivery is not None:
+                sub.handler(delivery)
+                handled = True
+        return handled
+
+    def run(self):
+        while not self._closed:
+            try:
+                self._channel()
+                handled = self._dispatch()
+                # her mesajdan sonra yeni gelenleri buffer'a al ki öncelikli lane beklemesin
+                self._conn.process_data_events(time_limit=0 if handled else 0.2)
+            except Exception as e:
+                if self._closed:
+                    break
+                print(f"[{self.name}] consuming error: {e}; reconnecting...", flush=True)
+                self.reconnect()
+                time.sleep(2)
+
+    def reconnect(self):
+        self._teardown()
+        self.connect()
+
+    def _teardown(self):
+        for obj in (self._ch, self._conn):
+            try:
+                obj.close()
+            except Exception:  # noqa
+                pass
+        self._ch = self._conn = None
+
+    def close(self):
+        self._closed = True
+        self._teardown()
+
+# ---------------------------------------------------------------------------
+# in-process
+# ---------------------------------------------------------------------------
+
+class InProcTransport(Transport):
+    """
+    Broker'sız, süreç içi transport. Payload'lar kopyalanmadan paylaşılır;
+    handler'lar payload'ı değiştirmemeli.
+    drop_unroutable=True bağlı kuyruğu olmayan mesajı sessizce düşürür (benchmark için);
+    varsayılan AMQP + confirm ile aynı: UnroutableError.
+    """
+
+    def __init__(self, name: str = "inproc", drop_unroutable: bool = False):
+        self.name = name
+        self.drop_unroutable = drop_unroutable
+        self._lock = threading.Lock()
+        self._subs = {}                      # queue -> Subscription
+        self._bindings = defaultdict(list)   # event type -> [Subscription]
+        self._threads = []
+        self._stop = threading.Event()
+        self.published = 0
+
+    def publish(self, event_type: str, payload: dict, mandatory: bool = True):
+        lane = lane_of(payload)
+        with self._lock:
+            subs = self._bindings.get(event_type)
+            if not subs and mandatory and not self.drop_unroutable:
+                raise UnroutableError(f"no queue bound for {lane_routing_key(event_type, lane)}")
+            self.published += 1
+            for sub in subs or ():
+                sub.buffer_for(lane).append((event_type, payload))
+                sub.cond.notify()
+
+    def declare(self, queue: str, routing_keys, lanes: bool = False):
+        with self._lock:
+            if queue in self._subs:
+                return
+            sub = Subscription(queue, routing_keys, None, 1, lanes)
+            sub.cond = threading.Condition(self._lock)
+            self._subs[queue] = sub
+            for rk in sub.routing_keys:
+                self._bindings[rk].append(sub)
+
+    def subscribe(self, queue: str, routing_keys, handler, prefetch: int = 10, lanes: bool = False):
+        sub = Subscription(queue, routing_keys, handler, prefetch, lanes)
+        sub.cond = threading.Condition(self._lock)
+        with self._lock:
+            old = self._subs.pop(queue, None)
+            for subs in self._bindings.values():
+                if old in subs:
+                    subs.remove(old)
+            if old is not None:
+                # declare() ile tutulan ya da önceki consumer'dan kalan mesajlar devredilir
+                for buffer in old.buffers.values():
+                    for event_type, payload in buffer:
+                        sub.buffer_for(lane_of(payload)).append((event_type, payload))
+            self._subs[queue] = sub
+            for rk in sub.routing_keys:
+                self._bindings[rk].append(sub)
+            started = bool(self._threads)
+        if started:
+            self._start_consumer(sub)
+
+    def _take(self, sub: Subscription, block: bool):
+        """Kilidi bir kez alıp lane ağırlığına göre en fazla `prefetch` mesaj çeker."""
+        with sub.cond:
+            while block and not sub.buffered() and not self._stop.is_set():
+                sub.cond.wait(0.5)
+            batch = []
+            while len(batch) < sub.prefetch:
+                msg = sub.next()
+                if msg is None:
+                    break
+                batch.append(msg)
+            return batch
+
+    def _deliver(self, sub: Subscription, batch):
+        for event_type, payload in batch:
+            def _nack(requeue, rk=event_type, body=payload):
+                if requeue:
+                    with sub.cond:
+                        sub.buffer_for(lane_of(body)).append((rk, body))
+                        sub.cond.notify()
+            try:
+                sub.handler(Delivery(event_type, payload, _noop, _nack))
+            except Exception as e:
+                print(f"[{self.name}] handler error on {sub.queue}: {e}", flush=True)
+
+    def drain(self, max_messages: int = None) -> int:
+        """Tüm kuyruklar boşalana kadar mesajları çağıran thread'de işler (test/benchmark için)."""
+        delivered = 0
+        while max_messages is None or delivered < max_messages:
+            progressed = False
+            for sub in list(self._subs.values()):
+                if sub.handler is None:
+                    continue
+                batch = self._take(sub, block=False)
+                if batch:
+                    self._deliver(sub, batch)
+                    delivered += len(batch)
+                    progressed = True
+            if not progressed:
+                break
+        return delivered
+
+    def pending(self) -> int:
+        with self._lock:
+            return sum(sub.buffered() for sub in self._subs.values())
+
+    def _start_consumer(self, sub: Subscription):
+        def _loop():
+            while not self._stop.is_set():
+                batch = self._take(sub, block=True)
+                if batch:
+                    self._deliver(sub, batch)
+
+        t = threading.Thread(target=_loop, name=f"consumer-{sub.queue}", daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def start(self):
+        """Her subscription için bir consumer thread'i başlatır ve hemen döner."""
+        with self._lock:
+            subs = [sub for sub in self._subs.values() if sub.handler is not None]
+        for sub in subs:
+            self._start_consumer(sub)
+
+    def run(self):
+        if not self._threads:
+            self.start()
+        self._stop.wait()
+
+    def close(self):
+        self._stop.set()
+        with self._lock:
+            for sub in self._subs.values():
+                sub.cond.notify_all()
+
+def _noop():
+    pass
+
+_inproc = None
+_inproc_lock = threading.Lock()
+
+def create_transport(name: str) -> Transport:
+    kind = os.getenv("EVENT_TRANSPORT", "amqp")
+    if kind == "amqp":
+        confirm = os.getenv("PUBLISH_CONFIRM", "1") != "0"
+        return AmqpTransport(os.getenv("RABBITMQ_URL"), name=name, confirm=confirm)
+    if kind == "inproc":
+        global _inproc
+        with _inproc_lock:
+            if _inproc is None:
+                _inproc = InProcTransport()
+            return _inproc
+    raise ValueError(f"unknown EVENT_TRANSPORT={kind!r} (expected amqp | inproc)")
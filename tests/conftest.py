@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+SERVICES = Path(__file__).resolve().parent.parent / "services"
+# shared modüller ve order-api'nin app paketi Docker imajlarındaki gibi import edilir;
+# worker.py/publisher.py dosyaları aynı adı taşıdığından testlerde dosya yolundan yüklenir
+for d in ("shared", "order-api"):
+    sys.path.insert(0, str(SERVICES / d))
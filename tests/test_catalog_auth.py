@@ -0,0 +1,35 @@
+import pytest
+
+# order-api bağımlılıkları (services/order-api/requirements.txt) + TestClient için httpx
+for mod in ("fastapi", "sqlalchemy", "psycopg2", "email_validator", "httpx"):
+    pytest.importorskip(mod)
+from fastapi.testclient import TestClient
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("DATABASE_URL", "sqlite://")
+    from app import main, catalog
+    # import_catalog'a ulaşılırsa DB'ye gitmeden yakala
+    monkeypatch.setattr(catalog, "import_catalog", lambda fileobj, fmt: {"format": fmt})
+    # lifespan (sweeper) başlamasın diye context manager olmadan
+    return TestClient(main.app), catalog
+
+def test_disabled_without_admin_token(client, monkeypatch):
+    http, catalog = client
+    monkeypatch.setattr(catalog, "ADMIN_TOKEN", "")
+    r = http.post("/catalog/import", content=b"sku\n", headers={"Authorization": "Bearer anything"})
+    assert r.status_code == 403
+
+@pytest.mark.parametrize("header", [None, "Bearer wrong", "Basic s3cret", "s3cret"])
+def test_rejects_missing_or_wrong_token(client, monkeypatch, header):
+    http, catalog = client
+    monkeypatch.setattr(catalog, "ADMIN_TOKEN", "s3cret")
+    headers = {"Authorization": header} if header else {}
+    r = http.post("/catalog/import", content=b"sku\n", headers=headers)
+    assert r.status_code == 401
+
+def test_accepts_admin_token(client, monkeypatch):
+    http, catalog = client
+    monkeypatch.setattr(catalog, "ADMIN_TOKEN", "s3cret")
+    r = http.post("/catalog/import?format=ndjson", content=b"{}\n", headers={"Authorization": "Bearer s3cret"})
+    assert r.status_code == 200 and r.json() == {"format": "ndjson"}
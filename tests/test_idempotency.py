@@ -0,0 +1,132 @@
+import threading
+import pytest
+
+pytest.importorskip("sqlalchemy")
+from sqlalchemy.exc import IntegrityError
+
+@pytest.fixture
+def idempotency(monkeypatch):
+    # database modülü import'ta engine kurar; bağlantı açılmaz
+    monkeypatch.setenv("DATABASE_URL", "sqlite://")
+    from app import idempotency
+    monkeypatch.setattr(idempotency, "cache", idempotency.ResponseCache(max_size=100, ttl_sec=60))
+    monkeypatch.setattr(idempotency, "_inflight", {})
+    return idempotency
+
+class FakeDB:
+    def __init__(self):
+        self.rollbacks = 0
+
+    def rollback(self):
+        self.rollbacks += 1
+
+class FakeCreate:
+    def __init__(self, response=None, error=None):
+        self.response = response or {"order_id": "o1", "status": "placed"}
+        self.error = error
+        self.calls = 0
+
+    def __call__(self, db):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+def integrity_error():
+    return IntegrityError("INSERT INTO idempotency_keys ...", {}, Exception("duplicate key"))
+
+# --- ResponseCache -----------------------------------------------------------
+
+def test_cache_get_returns_stored_entry(idempotency):
+    cache = idempotency.ResponseCache(max_size=10, ttl_sec=60)
+    cache.put("k1", "h1", {"order_id": "o1"})
+    assert cache.get("k1") == ("h1", {"order_id": "o1"})
+    assert cache.get("missing") is None
+
+def test_cache_evicts_least_recently_used(idempotency):
+    cache = idempotency.ResponseCache(max_size=2, ttl_sec=60)
+    cache.put("a", "h", {})
+    cache.put("b", "h", {})
+    cache.get("a")
+    cache.put("c", "h", {})
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+def test_cache_drops_expired_entries(idempotency, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(idempotency.time, "monotonic", lambda: now[0])
+    cache = idempotency.ResponseCache(max_size=10, ttl_sec=60)
+    cache.put("a", "h", {})
+    cache.put("b", "h", {}, ttl_sec=600)
+    now[0] += 61
+    assert cache.get("a") is None
+    assert cache.purge_expired() == 0
+    now[0] += 600
+    assert cache.purge_expired() == 1
+
+# --- run_once ----------------------------------------------------------------
+
+def test_replay_returns_stored_response(idempotency, monkeypatch):
+    monkeypatch.setattr(idempotency, "_lookup_db", lambda db, key: None)
+    create = FakeCreate()
+    assert idempotency.run_once(FakeDB(), "k", "h", create) == (create.response, False)
+    assert idempotency.run_once(FakeDB(), "k", "h", create) == (create.response, True)
+    assert create.calls == 1
+
+def test_replay_from_db_when_not_cached(idempotency, monkeypatch):
+    stored = {"order_id": "o9", "status": "paid"}
+    monkeypatch.setattr(idempotency, "_lookup_db", lambda db, key: ("h", stored))
+    create = FakeCreate()
+    assert idempotency.run_once(FakeDB(), "k", "h", create) == (stored, True)
+    assert create.calls == 0
+
+def test_different_body_is_a_conflict(idempotency, monkeypatch):
+    monkeypatch.setattr(idempotency, "_lookup_db", lambda db, key: None)
+    idempotency.run_once(FakeDB(), "k", "h1", FakeCreate())
+    with pytest.raises(idempotency.IdempotencyConflict):
+        idempotency.run_once(FakeDB(), "k", "h2", FakeCreate())
+
+def test_waiting_duplicate_times_out(idempotency, monkeypatch):
+    monkeypatch.setattr(idempotency, "WAIT_SEC", 0.05)
+    # aynı anahtarla başka bir istek hâlâ uçuşta
+    idempotency._inflight["k"] = threading.Event()
+    create = FakeCreate()
+    with pytest.raises(TimeoutError):
+        idempotency.run_once(FakeDB(), "k", "h", create)
+    assert create.calls == 0
+
+def test_waiting_duplicate_gets_leader_response(idempotency, monkeypatch):
+    monkeypatch.setattr(idempotency, "_lookup_db", lambda db, key: None)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_create(db):
+        started.set()
+        release.wait(5)
+        return {"order_id": "o1", "status": "placed"}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(idempotency.run_once(FakeDB(), "k", "h", slow_create)))
+    leader.start()
+    started.wait(5)
+    follower = FakeCreate()
+    threading.Timer(0.05, release.set).start()
+    replayed = idempotency.run_once(FakeDB(), "k", "h", follower)
+    leader.join(5)
+    assert results == [({"order_id": "o1", "status": "placed"}, False)]
+    assert replayed == ({"order_id": "o1", "status": "placed"}, True)
+    assert follower.calls == 0
+
+def test_integrity_error_falls_back_to_db_row(idempotency, monkeypatch):
+    # başka bir süreç aynı anahtarı bizden önce commit etti
+    stored = {"order_id": "o2", "status": "placed"}
+    rows = iter([None, ("h", stored)])
+    monkeypatch.setattr(idempotency, "_lookup_db", lambda db, key: next(rows))
+    db = FakeDB()
+    assert idempotency.run_once(db, "k", "h", FakeCreate(error=integrity_error())) == (stored, True)
+    assert db.rollbacks == 1
+
+def test_integrity_error_without_db_row_is_raised(idempotency, monkeypatch):
+    monkeypatch.setattr(idempotency, "_lookup_db", lambda db, key: None)
+    with pytest.raises(IntegrityError):
+        idempotency.run_once(FakeDB(), "k", "h", FakeCreate(error=integrity_error()))
+    assert "k" not in idempotency._inflight
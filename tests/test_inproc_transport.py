@@ -0,0 +1,110 @@
+import pytest
+from transport import InProcTransport, UnroutableError
+
+class Recorder:
+    def __init__(self, ack=True):
+        self.ack = ack
+        self.seen = []
+
+    def __call__(self, delivery):
+        self.seen.append((delivery.routing_key, delivery.payload.get("priority"), delivery.payload["n"]))
+        if self.ack:
+            delivery.ack()
+
+def test_publish_without_bound_queue_raises():
+    bus = InProcTransport()
+    with pytest.raises(UnroutableError):
+        bus.publish("order.placed", {"n": 1})
+    assert bus.published == 0
+
+def test_drop_unroutable_discards_silently():
+    bus = InProcTransport(drop_unroutable=True)
+    bus.publish("order.placed", {"n": 1})
+    assert bus.published == 1 and bus.pending() == 0
+
+def test_routes_by_event_type_and_drains():
+    bus = InProcTransport()
+    placed, paid = Recorder(), Recorder()
+    bus.subscribe("q.placed", ["order.placed"], placed)
+    bus.subscribe("q.paid", ["payment.completed"], paid)
+    bus.publish("order.placed", {"n": 1})
+    bus.publish("payment.completed", {"n": 2})
+    bus.publish("order.placed", {"n": 3})
+    assert bus.pending() == 3
+    assert bus.drain() == 3
+    assert bus.pending() == 0
+    assert [n for _, _, n in placed.seen] == [1, 3]
+    assert paid.seen == [("payment.completed", None, 2)]
+
+def test_drain_respects_max_messages():
+    bus = InProcTransport()
+    rec = Recorder()
+    bus.subscribe("q.placed", ["order.placed"], rec, prefetch=1)
+    for n in range(5):
+        bus.publish("order.placed", {"n": n})
+    assert bus.drain(max_messages=2) == 2
+    assert bus.pending() == 3
+
+def test_priority_lanes_are_weighted():
+    bus = InProcTransport()
+    rec = Recorder()
+    bus.subscribe("q.placed", ["order.placed"], rec, prefetch=100, lanes=True)
+    for n in range(10):
+        bus.publish("order.placed", {"n": n, "priority": "standard"})
+    for n in range(10, 22):
+        bus.publish("order.placed", {"n": n, "priority": "vip"})
+    bus.drain()
+    lanes = [lane for _, lane, _ in rec.seen]
+    # vip standard backlog'unu beklemez (6:1), ama standard da aç kalmaz
+    assert lanes[0] == "vip"
+    assert lanes[:7].count("standard") == 1 and lanes[7:14].count("standard") == 1
+    # lane içinde sıra korunur
+    assert [n for _, lane, n in rec.seen if lane == "standard"] == list(range(10))
+
+def test_lane_subscription_without_lanes_gets_every_lane():
+    bus = InProcTransport()
+    rec = Recorder()
+    bus.subscribe("q.placed", ["order.placed"], rec)
+    bus.publish("order.placed", {"n": 1, "priority": "vip"})
+    bus.publish("order.placed", {"n": 2, "priority": "express"})
+    bus.drain()
+    assert [n for _, _, n in rec.seen] == [1, 2]
+
+def test_nack_with_requeue_redelivers():
+    bus = InProcTransport()
+    attempts = []
+
+    def flaky(delivery):
+        attempts.append(delivery.payload["n"])
+        if len(attempts) == 1:
+            delivery.nack(requeue=True)
+        else:
+            delivery.ack()
+
+    bus.subscribe("q.placed", ["order.placed"], flaky)
+    bus.publish("order.placed", {"n": 1})
+    assert bus.drain() == 2
+    assert attempts == [1, 1]
+
+def test_nack_without_requeue_drops():
+    bus = InProcTransport()
+    rec = Recorder(ack=False)
+    bus.subscribe("q.placed", ["order.placed"], lambda d: (rec(d), d.nack()))
+    bus.publish("order.placed", {"n": 1})
+    assert bus.drain() == 1 and bus.pending() == 0
+
+def test_declared_queue_holds_messages_until_subscribe():
+    bus = InProcTransport()
+    bus.declare("q.placed", ["order.placed"], lanes=True)
+    bus.publish("order.placed", {"n": 1, "priority": "vip"})
+    bus.publish("order.placed", {"n": 2})
+    assert bus.drain() == 0 and bus.pending() == 2
+
+    rec = Recorder()
+    bus.subscribe("q.placed", ["order.placed"], rec, lanes=True)
+    assert bus.drain() == 2
+    assert sorted(n for _, _, n in rec.seen) == [1, 2]
+    # tekrar declare mevcut consumer'ı ezmez
+    bus.declare("q.placed", ["order.placed"], lanes=True)
+    bus.publish("order.placed", {"n": 3})
+    assert bus.drain() == 1
@@ -0,0 +1,19 @@
+from collections import Counter
+from transport import LaneScheduler
+
+def test_picks_follow_weights():
+    sched = LaneScheduler({"vip": 6, "express": 3, "standard": 1})
+    picks = [sched.pick(("vip", "express", "standard")) for _ in range(100)]
+    assert Counter(picks) == {"vip": 60, "express": 30, "standard": 10}
+
+def test_picks_are_interleaved():
+    # smooth WRR: her turda (10 seçim) standard da sıra alır, vip art arda yığılmaz
+    sched = LaneScheduler({"vip": 6, "express": 3, "standard": 1})
+    picks = [sched.pick(("vip", "express", "standard")) for _ in range(10)]
+    assert picks.count("standard") == 1
+    assert all(picks[i:i + 3] != ["vip"] * 3 for i in range(len(picks) - 2))
+
+def test_only_ready_lanes_are_picked():
+    sched = LaneScheduler({"vip": 6, "express": 3, "standard": 1})
+    assert {sched.pick(("standard",)) for _ in range(5)} == {"standard"}
+    assert sched.pick(()) is None
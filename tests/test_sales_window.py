@@ -0,0 +1,106 @@
+import importlib.util
+from pathlib import Path
+import pytest
+
+np = pytest.importorskip("numpy")
+
+WORKER = Path(__file__).resolve().parent.parent / "services" / "analytics-service" / "worker.py"
+spec = importlib.util.spec_from_file_location("analytics_worker", WORKER)
+analytics = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(analytics)
+
+WINDOW = 5
+NOW = 1_000_000
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [NOW]
+    monkeypatch.setattr(analytics, "now_minute", lambda: now[0])
+    return now
+
+def placed(*rows):
+    batch = analytics.Batch()
+    for minute, sku, qty in rows:
+        batch.add("order.placed", {"items": [{"sku": sku, "qty": qty}]}, minute)
+    return batch
+
+def test_totals_within_window(clock):
+    win = analytics.SalesWindow(WINDOW, sku_capacity=2)
+    win.apply(placed((NOW - 1, "A", 2), (NOW, "A", 1), (NOW, "B", 4)))
+    assert win.totals(WINDOW)["orders_placed"] == 3
+    assert win.totals(1)["orders_placed"] == 2
+    assert win.sku("A", WINDOW)["units_placed"] == 3
+    assert [r["sku"] for r in win.top_skus(WINDOW, 2, "units_placed")] == ["B", "A"]
+
+def test_out_of_window_events_are_dropped(clock):
+    win = analytics.SalesWindow(WINDOW)
+    win.apply(placed((NOW - WINDOW, "OLD", 1), (NOW + 1, "FUTURE", 1), (NOW, "A", 1)))
+    assert win.totals(WINDOW)["orders_placed"] == 1
+    assert win.sku("OLD", WINDOW) is None and win.sku("FUTURE", WINDOW) is None
+
+def test_slot_rollover_resets_stale_minute(clock):
+    win = analytics.SalesWindow(WINDOW)
+    win.apply(placed((NOW, "A", 1)))
+    # aynı slot'a düşen dakika: eski sayaç sıfırlanıp yeni dakikaya devredilir
+    clock[0] = NOW + WINDOW
+    win.apply(placed((NOW + WINDOW, "A", 5)))
+    assert win.totals(WINDOW)["orders_placed"] == 1
+    assert win.sku("A", WINDOW)["units_placed"] == 5
+    # yeni event gelmeden pencereden çıkan dakika okumada sayılmaz
+    clock[0] = NOW + 2 * WINDOW
+    assert win.totals(WINDOW)["orders_placed"] == 0
+
+def test_snapshot_restore(clock, tmp_path):
+    win = analytics.SalesWindow(WINDOW)
+    win.apply(placed((NOW - 2, "A", 2), (NOW, "B", 3)))
+    path = str(tmp_path / "analytics.npz")
+    win.save(path)
+
+    restored = analytics.SalesWindow.load(path, window=WINDOW)
+    assert restored.events == win.events
+    assert restored.totals(WINDOW) == win.totals(WINDOW)
+    assert restored.sku("B", WINDOW)["units_placed"] == 3
+    with pytest.raises(ValueError):
+        analytics.SalesWindow.load(path, window=WINDOW + 1)
+
+def test_revenue_is_exact_per_sku(clock):
+    win = analytics.SalesWindow(WINDOW)
+    batch = analytics.Batch()
+    for _ in range(100_000):
+        batch.add("payment.completed",
+                  {"items": [{"sku": "A", "qty": 1, "unit_price": 199.9}], "total_amount": 199.9}, NOW)
+    win.apply(batch)
+    assert win.sku("A", WINDOW)["revenue"] == 19_990_000.0
+    assert win.totals(WINDOW)["revenue"] == 19_990_000.0
+    assert win.top_skus(WINDOW, 1, "revenue")[0]["units_paid"] == 100_000
+
+def test_snapshot_restore_from_single_array_format(clock, tmp_path):
+    win = analytics.SalesWindow(WINDOW)
+    win.apply(placed((NOW, "A", 2)))
+    path = str(tmp_path / "old.npz")
+    # sku_units/sku_revenue ayrılmadan önceki snapshot biçimi
+    legacy = np.zeros((len(analytics.SKU_METRICS), 1, WINDOW), dtype=np.float32)
+    legacy[analytics.S_PLACED] = win.sku_units[0, :1]
+    np.savez(path, skus=np.array(["A"]), sku_stats=legacy, minute_stats=win.minute_stats,
+             slot_minute=win.slot_minute, events=np.array(win.events))
+    restored = analytics.SalesWindow.load(path, window=WINDOW)
+    assert restored.sku("A", WINDOW)["units_placed"] == 2
+
+def test_sku_endpoint_decodes_path(clock):
+    import json, threading, urllib.request, urllib.error
+    from http.server import ThreadingHTTPServer
+
+    win = analytics.SalesWindow(WINDOW)
+    win.apply(placed((NOW, "TSHIRT BLK/M", 3)))
+    server = ThreadingHTTPServer(("127.0.0.1", 0), analytics.make_handler(win))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urllib.request.urlopen(f"{base}/skus/TSHIRT%20BLK%2FM") as r:
+            assert json.load(r)["units_placed"] == 3
+        with pytest.raises(urllib.error.HTTPError) as e:
+            urllib.request.urlopen(f"{base}/skus/NOPE")
+        assert e.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,105 @@
+import importlib.util
+from collections import namedtuple
+from contextlib import contextmanager
+from pathlib import Path
+import pytest
+
+pytest.importorskip("sqlalchemy")
+from transport import InProcTransport, UnroutableError
+
+SERVICES = Path(__file__).resolve().parent.parent / "services"
+Row = namedtuple("Row", "id event_type payload")
+
+def load_service(monkeypatch, name: str, path: Path):
+    # servisler engine'i import'ta kurar; sqlite ile bağlantı açılmaz
+    monkeypatch.setenv("DATABASE_URL", "sqlite://")
+    spec = importlib.util.spec_from_file_location(name, path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+@pytest.fixture
+def publisher(monkeypatch):
+    return load_service(monkeypatch, "test_publisher", SERVICES / "order-publisher" / "publisher.py")
+
+class FakeDB:
+    def __init__(self):
+        self.updates = []
+
+    def execute(self, stmt, params):
+        status = "FAILED" if "FAILED" in str(stmt) else "PUBLISHED"
+        self.updates.append((params["id"], status))
+
+class FakeBus:
+    def __init__(self, errors):
+        self.errors = errors   # event type -> exception
+        self.published = []
+        self.reconnects = 0
+
+    def publish(self, event_type, payload, mandatory=True):
+        if mandatory and event_type in self.errors:
+            raise self.errors[event_type]
+        self.published.append(event_type)
+
+    def reconnect(self):
+        self.reconnects += 1
+
+def test_unroutable_rows_fail_without_reconnect(publisher):
+    bus = FakeBus({"legacy.event": UnroutableError("no queue bound for legacy.event")})
+    rows = [Row(1, "legacy.event", {}), Row(2, "legacy.event", {}), Row(3, "order.placed", {})]
+    db = FakeDB()
+    publisher.publish_batch(bus, rows, db)
+    assert db.updates == [(1, "FAILED"), (2, "FAILED"), (3, "PUBLISHED")]
+    assert bus.published == ["order.placed"]
+    assert bus.reconnects == 0
+
+def test_connection_errors_reconnect_and_stay_new(publisher):
+    bus = FakeBus({"order.placed": ConnectionError("channel closed")})
+    db = FakeDB()
+    publisher.publish_batch(bus, [Row(1, "order.placed", {})], db)
+    assert db.updates == []
+    assert bus.reconnects == 2
+
+def test_catalog_updates_publish_without_a_consumer(publisher):
+    bus = InProcTransport()
+    db = FakeDB()
+    publisher.publish_batch(bus, [Row(1, "catalog.updated", {"skus": ["A"]})], db)
+    assert db.updates == [(1, "PUBLISHED")]
+    assert bus.published == 1 and bus.pending() == 0
+
+def test_publisher_declares_inventory_queue(publisher):
+    bus = InProcTransport()
+    publisher.declare_queues(bus)
+    bus.publish("order.placed", {"order_id": "o1", "priority": "vip"})
+    assert bus.pending() == 1
+
+@pytest.mark.parametrize("service, handler", [
+    ("inventory-service", "handle_order_placed"),
+    ("payment-service", "handle_inventory_reserved"),
+])
+def test_worker_requeues_on_unroutable(monkeypatch, service, handler):
+    worker = load_service(monkeypatch, f"test_{service}", SERVICES / service / "worker.py")
+    rolled_back = []
+
+    @contextmanager
+    def session_scope():
+        try:
+            yield None
+        except Exception:
+            rolled_back.append(True)
+            raise
+
+    def unroutable(bus, db, evt):
+        raise UnroutableError("no queue bound for inventory.reserved")
+
+    monkeypatch.setattr(worker, "session_scope", session_scope)
+    monkeypatch.setattr(worker, handler, unroutable)
+    monkeypatch.setattr(worker, "UNROUTABLE_RETRY_SEC", 0)
+    bus = InProcTransport()
+    worker.register(bus)
+    event = "order.placed" if service == "inventory-service" else "inventory.reserved"
+    bus.publish(event, {"order_id": "o1"})
+    assert bus.drain(max_messages=1) == 1
+    # ack'lenmedi: transaction geri alındı ve mesaj kuyruğa döndü
+    assert rolled_back == [True]
+    assert bus.pending() == 1